@@ -4,13 +4,38 @@ AI-powered wardrobe management and outfit recommendations
 """
 
 import os
-from flask import Flask, request, jsonify
+import re
+import sqlite3
+import time
+import threading
+import tempfile
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import urlparse
+import requests
+from flask import Flask, Request, request, jsonify
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import raiseload, selectinload, validates
+from lxml import etree
 from datetime import datetime
 
+# Uploads up to this size stay in memory; larger ones spill to a temp file
+UPLOAD_SPOOL_SIZE = 2 * 1024 * 1024
+
+
+class UploadRequest(Request):
+    """Request that spools multipart file parts into a SpooledTemporaryFile"""
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_SIZE, mode='rb+')
+
+
 # Initialize Flask app
 app = Flask(__name__)
+app.request_class = UploadRequest
 CORS(app)
 
 # Configuration - use absolute paths
@@ -27,10 +52,62 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['UPLOAD_FOLDER'] = UPLOAD_DIR
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max
 
+# Product page scraping limits - OG/Twitter meta tags live in the document head
+MAX_HTML_BYTES = 512 * 1024
+HTML_CHUNK_SIZE = 8 * 1024
+MIN_PRODUCT_IMAGE_AREA = 200 * 200  # first <img> hinted larger than this is taken as the product
+URL_CACHE_TTL = 24 * 60 * 60  # seconds before a cached page is revalidated
+URL_MEMORY_CACHE_SIZE = 512  # in-process entries kept in front of the url_cache table
+
+MAX_BULK_OUTFITS = 50
+MAX_BULK_ITEMS = 500
+
+SCRAPE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+}
+
+# Scraping patterns, compiled once at import instead of per request
+_DIGITS_RE = re.compile(r'[^\d]')
+_JUNK_RE = re.compile(r'(logo|icon|sprite|placeholder|pixel|1x1|tracking)', re.I)
+_TWITTER_IMAGE_XPATH = etree.XPath('//meta[@name="twitter:image"]/@content')
+_IMG_XPATH = etree.XPath('//img[@src or @data-src]')
+
+# Common product image selectors (XPath equivalents of the CSS selectors in comments)
+_PRODUCT_SELECTORS = [etree.XPath(selector) for selector in (
+    '//img[@data-zoom-image]',  # img[data-zoom-image]
+    '//img[contains(concat(" ", normalize-space(@class), " "), " product-image ")]',  # img.product-image
+    '//img[contains(concat(" ", normalize-space(@class), " "), " main-image ")]',  # img.main-image
+    '//img[@id="landingImage"]',  # img#landingImage (Amazon)
+    '//img[contains(@class, "product")]',  # img[class*="product"]
+    '//img[contains(@class, "gallery")]',  # img[class*="gallery"]
+    '//picture//source',  # picture source
+    '//*[contains(concat(" ", normalize-space(@class), " "), " product-gallery ")]//img',  # .product-gallery img
+    '//*[contains(concat(" ", normalize-space(@class), " "), " pdp-image ")]//img',  # .pdp-image img
+)]
+
 # Initialize database
 db = SQLAlchemy(app)
 
 
+@event.listens_for(Engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Use WAL journaling so readers don't block on writes and commits skip the full fsync"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    if ':memory:' in app.config['SQLALCHEMY_DATABASE_URI']:
+        return
+    
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA mmap_size=268435456")  # 256MB
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
 # ============== Models ==============
 
 class ClothingItem(db.Model):
@@ -44,10 +121,24 @@ class ClothingItem(db.Model):
     season = db.Column(db.String(50))  # summer, winter, all-season
     image_path = db.Column(db.String(255))
     is_favorite = db.Column(db.Boolean, default=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     last_worn = db.Column(db.DateTime)
     wear_count = db.Column(db.Integer, default=0)
 
+    CATEGORIES = ('tops', 'bottoms', 'layers', 'shoes', 'accessories')
+
+    __table_args__ = (
+        # Serves the category filter + newest-first sort in get_wardrobe with one index range scan
+        db.Index('ix_item_cat_created', 'category', created_at.desc()),
+        # Serves the outfit engine's category-grouped, least-worn-first scan
+        db.Index('ix_item_cat_wear', 'category', 'wear_count'),
+    )
+
+    @validates('primary_color')
+    def normalize_primary_color(self, key, value):
+        """Store colors lowercased so outfit scoring can compare them directly"""
+        return value.lower() if value else value
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -65,6 +156,15 @@ class ClothingItem(db.Model):
         }
 
 
+@event.listens_for(ClothingItem, 'after_insert')
+@event.listens_for(ClothingItem, 'after_update')
+@event.listens_for(ClothingItem, 'after_delete')
+def invalidate_wardrobe_cache(mapper, connection, target):
+    """Drop the outfit engine's cached candidate pools whenever a wardrobe item changes"""
+    from services.outfit_engine import invalidate_items_cache
+    invalidate_items_cache()
+
+
 class Outfit(db.Model):
     """Generated outfit combinations"""
     id = db.Column(db.Integer, primary_key=True)
@@ -76,10 +176,29 @@ class Outfit(db.Model):
     layer_id = db.Column(db.Integer, db.ForeignKey('clothing_item.id'))
     shoes_id = db.Column(db.Integer, db.ForeignKey('clothing_item.id'))
     accessory_id = db.Column(db.Integer, db.ForeignKey('clothing_item.id'))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     is_liked = db.Column(db.Boolean, default=False)
     is_saved = db.Column(db.Boolean, default=False)
 
+    # Lazy loading is disabled so list endpoints can't silently fall into N+1 queries;
+    # load these explicitly with selectinload when the items are needed
+    top = db.relationship('ClothingItem', foreign_keys=[top_id], lazy='raise')
+    bottom = db.relationship('ClothingItem', foreign_keys=[bottom_id], lazy='raise')
+    layer = db.relationship('ClothingItem', foreign_keys=[layer_id], lazy='raise')
+    shoes = db.relationship('ClothingItem', foreign_keys=[shoes_id], lazy='raise')
+    accessory = db.relationship('ClothingItem', foreign_keys=[accessory_id], lazy='raise')
+
+    ITEM_SLOTS = ('top', 'bottom', 'layer', 'shoes', 'accessory')
+
+    def items_dict(self):
+        """Serialize the outfit's items (relationships must be eager-loaded)"""
+        items = {}
+        for slot in self.ITEM_SLOTS:
+            item = getattr(self, slot)
+            if item:
+                items[slot] = item.to_dict()
+        return items
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -97,6 +216,165 @@ class Outfit(db.Model):
         }
 
 
+class UrlCache(db.Model):
+    """Product image found for a shopping page URL, shared across processes"""
+    __tablename__ = 'url_cache'
+    url = db.Column(db.String(2048), primary_key=True)
+    image_url = db.Column(db.String(2048), nullable=False)
+    etag = db.Column(db.String(255))
+    ts = db.Column(db.Integer, nullable=False)  # unix time of last fetch or revalidation
+
+
+# ============== Scraping ==============
+
+def _parse_product_image(response) -> Optional[str]:
+    """Find the main product image URL in a streamed HTML response"""
+    image_url = None
+    
+    # Stream raw bytes into an incremental parser (lxml sniffs the encoding itself),
+    # capped at MAX_HTML_BYTES so huge pages are never fully downloaded
+    parser = etree.HTMLPullParser(events=('start',), recover=True)
+    received = 0
+    try:
+        for chunk in response.iter_content(chunk_size=HTML_CHUNK_SIZE):
+            parser.feed(chunk)
+            received += len(chunk)
+            
+            # Strategy 1: Look for Open Graph image (most reliable for products)
+            # Stop downloading as soon as it shows up
+            for _, element in parser.read_events():
+                if element.tag == 'meta' and element.get('property') == 'og:image' and element.get('content'):
+                    image_url = element.get('content')
+                    break
+            
+            if image_url or received >= MAX_HTML_BYTES:
+                break
+    finally:
+        response.close()
+    
+    if image_url:
+        return image_url
+    
+    try:
+        doc = parser.close()
+    except etree.XMLSyntaxError:
+        # Nothing parseable was received (e.g. an empty body)
+        return None
+    if doc is None:
+        # Whitespace- or comment-only pages parse to no document at all
+        return None
+    
+    # Strategy 2: Look for Twitter card image
+    twitter_images = _TWITTER_IMAGE_XPATH(doc)
+    if twitter_images and twitter_images[0]:
+        return twitter_images[0]
+    
+    # Strategy 3: Look for product-specific image patterns
+    for selector in _PRODUCT_SELECTORS:
+        elements = selector(doc)
+        if elements:
+            element = elements[0]
+            srcset = element.get('srcset', '').split()
+            image_url = element.get('src') or element.get('data-src') or (srcset[0] if srcset else None)
+            if image_url:
+                return image_url
+    
+    # Strategy 4: Find the largest image on the page, stopping at the first clearly large one
+    best_img = None
+    best_size = 0
+    
+    for img in _IMG_XPATH(doc):
+        src = img.get('src') or img.get('data-src', '')
+        if not src or _JUNK_RE.search(src):
+            continue
+        
+        # Check for size hints
+        width = img.get('width', '0')
+        height = img.get('height', '0')
+        size = int(_DIGITS_RE.sub('', str(width)) or '0') * int(_DIGITS_RE.sub('', str(height)) or '0')
+        
+        if size > MIN_PRODUCT_IMAGE_AREA:
+            return src
+        if size > best_size:
+            best_size = size
+            best_img = src
+    
+    return best_img
+
+
+def _fetch_product_image(url: str) -> Optional[str]:
+    """
+    Fetch and parse a product page, going through the url_cache table first.
+    Stale entries are revalidated with If-None-Match; a 304 skips parsing entirely.
+    """
+    now = int(time.time())
+    cached = db.session.get(UrlCache, url)
+    if cached and now - cached.ts < URL_CACHE_TTL:
+        return cached.image_url
+    
+    # Fetch the page with a browser-like user agent
+    headers = dict(SCRAPE_HEADERS)
+    if cached and cached.etag:
+        headers['If-None-Match'] = cached.etag
+    
+    response = requests.get(url, headers=headers, timeout=10, stream=True)
+    if cached and response.status_code == 304:
+        response.close()
+        cached.ts = now
+        db.session.commit()
+        return cached.image_url
+    response.raise_for_status()
+    
+    image_url = _parse_product_image(response)
+    if not image_url:
+        return None
+    
+    # Make relative URLs absolute
+    if image_url.startswith('//'):
+        image_url = 'https:' + image_url
+    elif image_url.startswith('/'):
+        parsed = urlparse(url)
+        image_url = f"{parsed.scheme}://{parsed.netloc}{image_url}"
+    
+    db.session.merge(UrlCache(url=url, image_url=image_url, etag=response.headers.get('ETag'), ts=now))
+    db.session.commit()
+    return image_url
+
+
+# url -> (ts, image_url), least recently used first; entries expire with URL_CACHE_TTL like the table
+_IMAGE_URL_CACHE: 'OrderedDict[str, tuple]' = OrderedDict()
+_IMAGE_URL_CACHE_LOCK = threading.Lock()
+
+
+def _extract_image_impl(url: str) -> str:
+    """
+    In-process cache over _fetch_product_image; raises LookupError (not cached) when nothing is found.
+    Expired entries fall through to the table so they get revalidated.
+    """
+    now = int(time.time())
+    with _IMAGE_URL_CACHE_LOCK:
+        cached = _IMAGE_URL_CACHE.get(url)
+        if cached and now - cached[0] < URL_CACHE_TTL:
+            _IMAGE_URL_CACHE.move_to_end(url)
+            return cached[1]
+    
+    image_url = _fetch_product_image(url)
+    if not image_url:
+        raise LookupError(url)
+    
+    with _IMAGE_URL_CACHE_LOCK:
+        _IMAGE_URL_CACHE[url] = (now, image_url)
+        _IMAGE_URL_CACHE.move_to_end(url)
+        if len(_IMAGE_URL_CACHE) > URL_MEMORY_CACHE_SIZE:
+            _IMAGE_URL_CACHE.popitem(last=False)
+    return image_url
+
+
+def _is_optional_string(value) -> bool:
+    """True for a string or null (colors are stored lowercased, so they must be strings)"""
+    return value is None or isinstance(value, str)
+
+
 # ============== Routes ==============
 
 @app.route('/api/health', methods=['GET'])
@@ -114,7 +392,7 @@ def get_wardrobe():
     if category and category != 'all':
         query = query.filter_by(category=category)
     
-    items = query.order_by(ClothingItem.created_at.desc()).all()
+    items = query.options(raiseload('*')).order_by(ClothingItem.created_at.desc()).all()
     return jsonify([item.to_dict() for item in items])
 
 
@@ -123,6 +401,9 @@ def add_clothing_item():
     """Add a new clothing item to the wardrobe"""
     data = request.json
     
+    if not _is_optional_string(data.get('primaryColor')):
+        return jsonify({'error': 'primaryColor must be a string'}), 400
+    
     item = ClothingItem(
         name=data.get('name', 'Untitled'),
         category=data.get('category', 'tops'),
@@ -139,6 +420,58 @@ def add_clothing_item():
     return jsonify(item.to_dict()), 201
 
 
+@app.route('/api/wardrobe/bulk', methods=['POST'])
+def add_clothing_items_bulk():
+    """Add many clothing items in a single transaction"""
+    data = request.json
+    
+    if not isinstance(data, list):
+        return jsonify({'error': 'Expected a list of items'}), 400
+    if len(data) > MAX_BULK_ITEMS:
+        return jsonify({'error': f'At most {MAX_BULK_ITEMS} items per request'}), 400
+    
+    # Bulk inserts skip the ORM, so check every entry up front
+    for index, entry in enumerate(data):
+        if not isinstance(entry, dict):
+            return jsonify({'error': f'Item {index} must be an object'}), 400
+        name = entry.get('name', 'Untitled')
+        if not isinstance(name, str) or not name.strip():
+            return jsonify({'error': f'Item {index} name must be a non-empty string'}), 400
+        if entry.get('category', 'tops') not in ClothingItem.CATEGORIES:
+            return jsonify({'error': f"Item {index} has an unknown category: {entry.get('category')}"}), 400
+        for field in ('primaryColor', 'secondaryColor', 'style', 'season', 'imagePath'):
+            if not _is_optional_string(entry.get(field)):
+                return jsonify({'error': f'Item {index} {field} must be a string'}), 400
+    
+    now = datetime.utcnow()
+    mappings = [
+        {
+            'name': entry.get('name', 'Untitled'),
+            'category': entry.get('category', 'tops'),
+            # Bulk inserts bypass model validators, so normalize here too
+            'primary_color': (entry.get('primaryColor') or '').lower() or None,
+            'secondary_color': entry.get('secondaryColor'),
+            'style': entry.get('style'),
+            'season': entry.get('season'),
+            'image_path': entry.get('imagePath'),
+            'is_favorite': False,
+            'created_at': now,
+            'wear_count': 0,
+        }
+        for entry in data
+    ]
+    
+    # One executemany + one commit (a single fsync) regardless of batch size
+    db.session.bulk_insert_mappings(ClothingItem, mappings)
+    db.session.commit()
+    
+    # Bulk inserts skip mapper events too
+    from services.outfit_engine import invalidate_items_cache
+    invalidate_items_cache()
+    
+    return jsonify({'created': len(mappings)}), 201
+
+
 @app.route('/api/wardrobe/<int:item_id>', methods=['GET'])
 def get_clothing_item(item_id):
     """Get a specific clothing item"""
@@ -157,6 +490,8 @@ def update_clothing_item(item_id):
     if 'category' in data:
         item.category = data['category']
     if 'primaryColor' in data:
+        if not _is_optional_string(data['primaryColor']):
+            return jsonify({'error': 'primaryColor must be a string'}), 400
         item.primary_color = data['primaryColor']
     if 'secondaryColor' in data:
         item.secondary_color = data['secondaryColor']
@@ -168,6 +503,10 @@ def update_clothing_item(item_id):
         item.is_favorite = data['isFavorite']
     
     db.session.commit()
+    
+    from services.outfit_engine import invalidate_daily_outfit
+    invalidate_daily_outfit()
+    
     return jsonify(item.to_dict())
 
 
@@ -177,6 +516,10 @@ def delete_clothing_item(item_id):
     item = ClothingItem.query.get_or_404(item_id)
     db.session.delete(item)
     db.session.commit()
+    
+    from services.outfit_engine import invalidate_daily_outfit
+    invalidate_daily_outfit()
+    
     return jsonify({'message': 'Item deleted'}), 200
 
 
@@ -199,7 +542,7 @@ def process_image():
     # Import processors lazily to speed up startup
     from services.image_processor import ImageProcessor
     
-    processor = ImageProcessor()
+    processor = ImageProcessor(upload_dir=app.config['UPLOAD_FOLDER'])
     result = processor.process(file)
     
     return jsonify(result)
@@ -211,10 +554,6 @@ def extract_image_from_url():
     Extract the main product image from a shopping page URL.
     Supports most major e-commerce sites.
     """
-    import requests
-    from bs4 import BeautifulSoup
-    import re
-    
     data = request.json
     url = data.get('url', '').strip()
     
@@ -226,87 +565,7 @@ def extract_image_from_url():
         url = 'https://' + url
     
     try:
-        # Fetch the page with a browser-like user agent
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        image_url = None
-        
-        # Strategy 1: Look for Open Graph image (most reliable for products)
-        og_image = soup.find('meta', property='og:image')
-        if og_image and og_image.get('content'):
-            image_url = og_image['content']
-        
-        # Strategy 2: Look for Twitter card image
-        if not image_url:
-            twitter_image = soup.find('meta', attrs={'name': 'twitter:image'})
-            if twitter_image and twitter_image.get('content'):
-                image_url = twitter_image['content']
-        
-        # Strategy 3: Look for product-specific image patterns
-        if not image_url:
-            # Common product image selectors
-            selectors = [
-                'img[data-zoom-image]',
-                'img.product-image',
-                'img.main-image',
-                'img#landingImage',  # Amazon
-                'img[class*="product"]',
-                'img[class*="gallery"]',
-                'picture source',
-                '.product-gallery img',
-                '.pdp-image img',
-            ]
-            for selector in selectors:
-                element = soup.select_one(selector)
-                if element:
-                    image_url = element.get('src') or element.get('data-src') or element.get('srcset', '').split()[0]
-                    if image_url:
-                        break
-        
-        # Strategy 4: Find the largest image on the page
-        if not image_url:
-            images = soup.find_all('img')
-            best_img = None
-            best_size = 0
-            
-            for img in images:
-                src = img.get('src') or img.get('data-src', '')
-                if not src or 'logo' in src.lower() or 'icon' in src.lower():
-                    continue
-                
-                # Check for size hints
-                width = img.get('width', '0')
-                height = img.get('height', '0')
-                try:
-                    size = int(re.sub(r'[^\d]', '', str(width))) * int(re.sub(r'[^\d]', '', str(height)))
-                except:
-                    size = 0
-                
-                if size > best_size:
-                    best_size = size
-                    best_img = src
-            
-            if best_img:
-                image_url = best_img
-        
-        if not image_url:
-            return jsonify({'error': 'Could not find product image on this page'}), 404
-        
-        # Make relative URLs absolute
-        if image_url.startswith('//'):
-            image_url = 'https:' + image_url
-        elif image_url.startswith('/'):
-            from urllib.parse import urlparse
-            parsed = urlparse(url)
-            image_url = f"{parsed.scheme}://{parsed.netloc}{image_url}"
+        image_url = _extract_image_impl(url)
         
         return jsonify({
             'success': True,
@@ -314,6 +573,8 @@ def extract_image_from_url():
             'sourceUrl': url
         })
         
+    except LookupError:
+        return jsonify({'error': 'Could not find product image on this page'}), 404
     except requests.exceptions.Timeout:
         return jsonify({'error': 'Request timed out'}), 408
     except requests.exceptions.RequestException as e:
@@ -357,7 +618,7 @@ def process_image_from_url():
         
         # Process with our AI
         from services.image_processor import ImageProcessor
-        processor = ImageProcessor()
+        processor = ImageProcessor(upload_dir=app.config['UPLOAD_FOLDER'])
         
         # Remove background
         processed_image = processor.remove_background(image)
@@ -373,8 +634,7 @@ def process_image_from_url():
         
         # Save processed image
         filename = f"{uuid.uuid4().hex}.png"
-        save_path = os.path.join('uploads', filename)
-        os.makedirs('uploads', exist_ok=True)
+        save_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
         processed_image.save(save_path, 'PNG')
         
         return jsonify({
@@ -429,6 +689,28 @@ def generate_outfit():
     return jsonify({'error': 'Could not generate outfit'}), 400
 
 
+@app.route('/api/outfit/generate/bulk', methods=['POST'])
+def generate_outfits_bulk():
+    """Generate several outfit recommendations in a single transaction"""
+    from services.outfit_engine import OutfitEngine
+    
+    data = request.json or {}
+    style = data.get('style')
+    try:
+        count = int(data.get('count', 5))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'count must be an integer'}), 400
+    if not 1 <= count <= MAX_BULK_OUTFITS:
+        return jsonify({'error': f'count must be between 1 and {MAX_BULK_OUTFITS}'}), 400
+    
+    engine = OutfitEngine()
+    outfits = engine.generate_outfits(count, style_preference=style)
+    
+    if outfits:
+        return jsonify(outfits), 201
+    return jsonify({'error': 'Could not generate outfit'}), 400
+
+
 @app.route('/api/outfit/<int:outfit_id>/feedback', methods=['POST'])
 def outfit_feedback(outfit_id):
     """Record user feedback on an outfit"""
@@ -454,14 +736,30 @@ def outfit_feedback(outfit_id):
         outfit.is_saved = data['saved']
     
     db.session.commit()
+    
+    from services.outfit_engine import invalidate_daily_outfit
+    invalidate_daily_outfit()
+    
     return jsonify(outfit.to_dict())
 
 
 @app.route('/api/outfit/history', methods=['GET'])
 def get_outfit_history():
-    """Get outfit history"""
+    """Get outfit history, optionally with item details (?expand=items)"""
     limit = request.args.get('limit', 20, type=int)
-    outfits = Outfit.query.order_by(Outfit.created_at.desc()).limit(limit).all()
+    expand_items = request.args.get('expand') == 'items'
+    
+    query = Outfit.query
+    if expand_items:
+        # One extra SELECT ... IN per slot instead of one query per outfit item
+        query = query.options(*(selectinload(getattr(Outfit, slot)) for slot in Outfit.ITEM_SLOTS))
+    else:
+        query = query.options(raiseload('*'))
+    
+    outfits = query.order_by(Outfit.created_at.desc()).limit(limit).all()
+    
+    if expand_items:
+        return jsonify([{**outfit.to_dict(), 'items': outfit.items_dict()} for outfit in outfits])
     return jsonify([outfit.to_dict() for outfit in outfits])
 
 
@@ -469,6 +767,18 @@ def get_outfit_history():
 
 with app.app_context():
     db.create_all()
+    
+    # Normalize colors stored before primary_color was lowercased on write
+    db.session.execute(db.text(
+        "UPDATE clothing_item SET primary_color = lower(primary_color) "
+        "WHERE primary_color != lower(primary_color)"
+    ))
+    db.session.commit()
+    
+    # create_all skips tables that already exist, so add any new indexes to older databases
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
 
 
 if __name__ == '__main__':
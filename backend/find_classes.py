@@ -1,4 +1,5 @@
 
+import re
 from torchvision.models import MobileNet_V2_Weights
 
 weights = MobileNet_V2_Weights.IMAGENET1K_V1
@@ -9,7 +10,10 @@ print(f"Total categories: {len(categories)}")
 # Search for clothing related terms
 terms = ['jean', 'pants', 't-shirt', 'shirt', 'dress', 'skirt', 'jacket', 'coat', 'sweater', 'jersey', 'cardigan']
 
-for i, category in enumerate(categories):
-    for term in terms:
-        if term in category.lower():
-            print(f"Class {i}: {category}")
+# One alternation pattern scans each category once for all terms
+terms_re = re.compile('|'.join(map(re.escape, terms)))
+categories_lower = [category.lower() for category in categories]
+
+for i, (category, category_lower) in enumerate(zip(categories, categories_lower)):
+    if terms_re.search(category_lower):
+        print(f"Class {i}: {category}")
@@ -4,13 +4,237 @@ CPU-only image analysis for clothing items
 """
 
 import os
-import io
 import uuid
+import tempfile
+import threading
+from typing import Union
 from PIL import Image
 import numpy as np
 import cv2
-from sklearn.cluster import KMeans
-import webcolors
+from sklearn.cluster import MiniBatchKMeans
+
+
+# Pipeline stages accept either PIL images or RGB(A) uint8 arrays
+ImageLike = Union[Image.Image, np.ndarray]
+
+# Models are shared across requests so weights are only loaded once per process
+_CLASSIFIER = None
+_CATEGORIES = None  # ImageNet class names, loaded with the classifier
+_REMBG_SESSION = None
+_LOCK = threading.Lock()
+
+# Exported classifier weights, generated on first use
+_MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'models')
+_ONNX_INT8_MODEL_PATH = os.path.join(_MODEL_DIR, 'mobilenetv2.int8.onnx')
+
+# ImageNet normalization, shaped to broadcast over HWC pixel arrays
+_IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32).reshape(1, 1, 3)
+_IMAGENET_INV_STD = (1.0 / np.array([0.229, 0.224, 0.225], dtype=np.float32)).reshape(1, 1, 3)
+
+# Dominant colors are estimated from a random pixel sample rather than every pixel
+MAX_COLOR_SAMPLES = 10000
+
+# Simplified color palette for nearest-color naming
+_PALETTE_NAMES = [
+    'white', 'black', 'gray', 'red', 'blue', 'navy', 'green', 'yellow',
+    'orange', 'pink', 'purple', 'brown', 'beige', 'cream', 'tan',
+]
+_PALETTE_RGB = np.array([
+    [255, 255, 255],  # white
+    [0, 0, 0],        # black
+    [128, 128, 128],  # gray
+    [255, 0, 0],      # red
+    [0, 0, 255],      # blue
+    [0, 0, 128],      # navy
+    [0, 128, 0],      # green
+    [255, 255, 0],    # yellow
+    [255, 165, 0],    # orange
+    [255, 192, 203],  # pink
+    [128, 0, 128],    # purple
+    [139, 69, 19],    # brown
+    [245, 245, 220],  # beige
+    [255, 253, 208],  # cream
+    [210, 180, 140],  # tan
+], dtype=np.int32)
+
+
+def _nearest_palette_indices(rgbs: np.ndarray) -> np.ndarray:
+    """Index of the closest palette color for each row of an (N, 3) RGB array"""
+    diffs = _PALETTE_RGB[None, :, :] - np.asarray(rgbs, dtype=np.int32)[:, None, :]
+    return np.einsum('ijk,ijk->ij', diffs, diffs).argmin(axis=1)
+
+
+def _build_name_lut() -> np.ndarray:
+    """Palette index for every 5-bit-per-channel RGB value (32^3 entries), keyed by _lut_index"""
+    levels = (np.arange(32) << 3) | 4  # center of each 8-wide bucket
+    r, g, b = np.meshgrid(levels, levels, levels, indexing='ij')
+    grid = np.stack([r.ravel(), g.ravel(), b.ravel()], axis=1)
+    return _nearest_palette_indices(grid).astype(np.uint8)
+
+
+def _lut_index(rgbs: np.ndarray) -> np.ndarray:
+    """Quantize RGB values (any leading shape, last axis = 3) to _NAME_LUT indices"""
+    q = np.asarray(rgbs, dtype=np.int32) >> 3
+    return (q[..., 0] << 10) | (q[..., 1] << 5) | q[..., 2]
+
+
+_NAME_LUT = _build_name_lut()
+
+
+def _preprocess_for_classifier(rgb: np.ndarray) -> np.ndarray:
+    """Resize (short side 256), center-crop 224 and normalize an RGB array into a (1, 3, 224, 224) batch"""
+    height, width = rgb.shape[:2]
+    scale = 256 / min(height, width)
+    new_size = (max(224, round(width * scale)), max(224, round(height * scale)))
+    resized = cv2.resize(rgb, new_size, interpolation=cv2.INTER_AREA)
+    
+    top = (resized.shape[0] - 224) // 2
+    left = (resized.shape[1] - 224) // 2
+    crop = resized[top:top + 224, left:left + 224]
+    
+    # Scale, normalize and reorder to NCHW in a single float32 pass
+    normalized = (crop.astype(np.float32) * (1 / 255.0) - _IMAGENET_MEAN) * _IMAGENET_INV_STD
+    return np.ascontiguousarray(normalized.transpose(2, 0, 1)[None])
+
+
+def _save_png(image: ImageLike, path: str) -> None:
+    """Write an RGB(A) image as PNG using OpenCV's fast (low compression) encoder"""
+    array = np.asarray(image)
+    code = cv2.COLOR_RGBA2BGRA if array.shape[-1] == 4 else cv2.COLOR_RGB2BGR
+    ok, encoded = cv2.imencode('.png', cv2.cvtColor(array, code), [cv2.IMWRITE_PNG_COMPRESSION, 1])
+    if not ok:
+        raise ValueError('Could not encode image as PNG')
+    encoded.tofile(path)
+
+
+def _get_rembg_session():
+    """Return the shared rembg session, creating it on first use"""
+    global _REMBG_SESSION
+    if _REMBG_SESSION is None:
+        with _LOCK:
+            if _REMBG_SESSION is None:
+                from rembg import new_session
+                # Use u2net_cloth_seg for better clothing segmentation
+                _REMBG_SESSION = new_session("u2net")
+    return _REMBG_SESSION
+
+
+def _load_torch_classifier():
+    """Load the pretrained MobileNetV2 in eval mode"""
+    import torch
+    from torchvision import models
+    
+    torch.set_num_threads(os.cpu_count() or 1)
+    
+    model = models.mobilenet_v2(weights=models.MobileNet_V2_Weights.IMAGENET1K_V1)
+    model.eval()
+    return model
+
+
+def _export_onnx_classifier() -> str:
+    """Export MobileNetV2 to an int8-quantized ONNX file, reusing it if already exported"""
+    if os.path.exists(_ONNX_INT8_MODEL_PATH):
+        return _ONNX_INT8_MODEL_PATH
+    
+    import torch
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    
+    os.makedirs(_MODEL_DIR, exist_ok=True)
+    
+    # Build in a private directory next to the final path, then publish with an atomic
+    # rename, so concurrent workers or a crash never leave a partial model behind
+    with tempfile.TemporaryDirectory(dir=_MODEL_DIR) as work_dir:
+        float_path = os.path.join(work_dir, 'mobilenetv2.onnx')
+        int8_path = os.path.join(work_dir, 'mobilenetv2.int8.onnx')
+        
+        torch.onnx.export(
+            _load_torch_classifier(),
+            torch.randn(1, 3, 224, 224),
+            float_path,
+            opset_version=17,
+            input_names=['input'],
+            output_names=['logits'],
+            dynamic_axes={'input': {0: 'B'}, 'logits': {0: 'B'}},
+        )
+        # Only the MatMul/Gemm head: int8 ConvInteger weights have no CPU kernel in onnxruntime
+        quantize_dynamic(
+            float_path,
+            int8_path,
+            op_types_to_quantize=['MatMul', 'Gemm'],
+            weight_type=QuantType.QInt8,
+        )
+        os.replace(int8_path, _ONNX_INT8_MODEL_PATH)
+    return _ONNX_INT8_MODEL_PATH
+
+
+def _build_onnx_classifier():
+    """ONNX Runtime session over the exported model, wrapped as a batch -> logits callable"""
+    import onnxruntime as ort
+    
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.intra_op_num_threads = os.cpu_count() or 1
+    session = ort.InferenceSession(
+        _export_onnx_classifier(),
+        sess_options=options,
+        providers=['CPUExecutionProvider'],
+    )
+    input_name = session.get_inputs()[0].name
+    
+    def run_onnx(batch: np.ndarray) -> np.ndarray:
+        return session.run(None, {input_name: batch})[0]
+    
+    return run_onnx
+
+
+def _build_classifier():
+    """
+    Build a callable mapping an (N, 3, 224, 224) float32 batch to (N, 1000) logits.
+    Prefers ONNX Runtime; falls back to torch when onnxruntime is missing or the
+    export / session creation fails.
+    """
+    try:
+        return _build_onnx_classifier()
+    except Exception as e:
+        print(f"ONNX classifier unavailable, falling back to torch: {e}")
+    
+    import torch
+    
+    model = _load_torch_classifier()
+    # int8 weights for the classifier head (dynamic quantization covers Linear layers)
+    model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    example = torch.randn(1, 3, 224, 224)
+    
+    try:
+        # Compile and warm up now so the JIT cost isn't paid by the first request
+        compiled = torch.compile(model, mode='reduce-overhead')
+        with torch.no_grad():
+            compiled(example)
+        model = compiled
+    except Exception as e:
+        print(f"torch.compile unavailable, falling back to TorchScript: {e}")
+        # Trace once so later inferences run the TorchScript graph
+        with torch.no_grad():
+            model = torch.jit.trace(model, example)
+    
+    def run_torch(batch: np.ndarray) -> np.ndarray:
+        with torch.no_grad():
+            return model(torch.from_numpy(batch)).numpy()
+    
+    return run_torch
+
+
+def _get_classifier():
+    """Return the shared MobileNetV2 classifier, building it on first use"""
+    global _CLASSIFIER, _CATEGORIES
+    if _CLASSIFIER is None:
+        with _LOCK:
+            if _CLASSIFIER is None:
+                from torchvision.models import MobileNet_V2_Weights
+                
+                _CATEGORIES = MobileNet_V2_Weights.IMAGENET1K_V1.meta["categories"]
+                _CLASSIFIER = _build_classifier()
+    return _CLASSIFIER
 
 
 class ImageProcessor:
@@ -25,18 +249,22 @@ class ImageProcessor:
     # Season classifications  
     SEASONS = ['summer', 'winter', 'all-season']
     
-    def __init__(self):
-        self.rembg_session = None
-        self.classifier = None
+    def __init__(self, upload_dir: str = 'uploads'):
+        # Expected to exist already - the app creates it at startup
+        self._upload_dir = upload_dir
         
     def process(self, file) -> dict:
         """
         Process an uploaded image file.
         Returns detected attributes.
         """
-        # Read image
-        image_bytes = file.read()
-        image = Image.open(io.BytesIO(image_bytes)).convert('RGB')
+        # Decode straight from the upload stream (no PIL round-trip)
+        file.stream.seek(0)
+        buffer = np.frombuffer(file.stream.read(), np.uint8)
+        bgr = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+        if bgr is None:
+            raise ValueError('Could not decode image')
+        image = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
         
         # Generate unique filename
         filename = f"{uuid.uuid4().hex}.png"
@@ -48,9 +276,8 @@ class ImageProcessor:
         attributes = self.detect_attributes(image, category, colors)
         
         # Save processed image
-        save_path = os.path.join('uploads', filename)
-        os.makedirs('uploads', exist_ok=True)
-        processed_image.save(save_path, 'PNG')
+        save_path = os.path.join(self._upload_dir, filename)
+        _save_png(processed_image, save_path)
         
         return {
             'imagePath': save_path,
@@ -62,51 +289,33 @@ class ImageProcessor:
             'tags': attributes.get('tags', [])
         }
     
-    def remove_background(self, image: Image.Image) -> Image.Image:
+    def remove_background(self, image: ImageLike) -> ImageLike:
         """Remove background from clothing image using rembg"""
         try:
-            from rembg import remove, new_session
+            from rembg import remove
             
-            if self.rembg_session is None:
-                # Use u2net_cloth_seg for better clothing segmentation
-                self.rembg_session = new_session("u2net")
-            
-            result = remove(image, session=self.rembg_session)
+            result = remove(image, session=_get_rembg_session())
             return result
         except Exception as e:
             print(f"Background removal failed: {e}")
             return image
     
-    def detect_category(self, image: Image.Image) -> str:
+    def detect_category(self, image: ImageLike) -> str:
         """Detect clothing category using MobileNetV2 with ImageNet classes"""
         try:
-            import torch
-            from torchvision import models, transforms
-            
-            if self.classifier is None:
-                # Load pretrained MobileNetV2
-                self.classifier = models.mobilenet_v2(weights=models.MobileNet_V2_Weights.IMAGENET1K_V1)
-                self.classifier.eval()
+            classifier = _get_classifier()
             
             # Preprocess image
-            preprocess = transforms.Compose([
-                transforms.Resize(256),
-                transforms.CenterCrop(224),
-                transforms.ToTensor(),
-                transforms.Normalize(
-                    mean=[0.485, 0.456, 0.406],
-                    std=[0.229, 0.224, 0.225]
-                )
-            ])
-            
-            input_tensor = preprocess(image).unsqueeze(0)
+            rgb = np.asarray(image)
+            input_batch = _preprocess_for_classifier(rgb)
             
-            with torch.no_grad():
-                outputs = self.classifier(input_tensor)
+            logits = classifier(input_batch)[0]
             
             # Get top 5 predictions for better accuracy
-            probabilities = torch.nn.functional.softmax(outputs[0], dim=0)
-            top5_probs, top5_indices = torch.topk(probabilities, 5)
+            exp_logits = np.exp(logits - logits.max())
+            probabilities = exp_logits / exp_logits.sum()
+            top5_indices = np.argsort(-probabilities)[:5]
+            top5_probs = probabilities[top5_indices]
             
             # ImageNet class mappings for clothing items
             # Verified IDs:
@@ -163,11 +372,8 @@ class ImageProcessor:
             }
             
             # Use class names for logging if available
-            try:
-                class_name = self.classifier.get_weight_metadata()['categories'][top5_indices[0]]
-                print(f"Top detected class: {class_name} ({top5_indices[0]})")
-            except:
-                pass
+            if _CATEGORIES:
+                print(f"Top detected class: {_CATEGORIES[top5_indices[0]]} ({top5_indices[0]})")
 
             # Check top predictions against our categories
             for prob, idx in zip(top5_probs, top5_indices):
@@ -185,7 +391,7 @@ class ImageProcessor:
             print(f"No direct clothing match. Top class: {top_class}, confidence: {confidence:.2%}")
             
             # Use aspect ratio as a tie-breaker for ambiguous cases
-            width, height = image.size
+            height, width = rgb.shape[:2]
             ratio = height / width
             print(f"Aspect ratio: {ratio:.2f}")
 
@@ -218,7 +424,7 @@ class ImageProcessor:
             traceback.print_exc()
             return 'tops'  # Default fallback
     
-    def extract_colors(self, image: Image.Image, n_colors: int = 3) -> list:
+    def extract_colors(self, image: ImageLike, n_colors: int = 3) -> list:
         """Extract dominant colors using K-means clustering"""
         try:
             # Convert to numpy array
@@ -237,20 +443,28 @@ class ImageProcessor:
             if len(pixels) < n_colors:
                 return []
             
+            # Downsample - centroids of a 10k sample match the full image for dominant colors
+            if len(pixels) > MAX_COLOR_SAMPLES:
+                rng = np.random.default_rng(42)
+                pixels = pixels[rng.choice(len(pixels), MAX_COLOR_SAMPLES, replace=False)]
+            
+            # float32 keeps sklearn on its single-precision path instead of upcasting to float64
+            pixels = np.ascontiguousarray(pixels, dtype=np.float32)
+            
             # K-means clustering
-            kmeans = KMeans(n_clusters=n_colors, random_state=42, n_init=10)
+            kmeans = MiniBatchKMeans(n_clusters=n_colors, random_state=42, n_init=1, batch_size=1024, max_iter=50)
             kmeans.fit(pixels)
             
             # Get colors sorted by frequency
-            colors = kmeans.cluster_centers_.astype(int)
+            colors = kmeans.cluster_centers_.round().astype(np.uint8)
             labels, counts = np.unique(kmeans.labels_, return_counts=True)
             sorted_indices = np.argsort(-counts)
             
-            # Convert to color names
+            # Convert to color names with one LUT gather for all centers
+            palette_indices = _NAME_LUT[_lut_index(colors)]
             color_names = []
             for idx in sorted_indices:
-                rgb = tuple(colors[idx])
-                name = self._rgb_to_color_name(rgb)
+                name = _PALETTE_NAMES[palette_indices[idx]]
                 if name and name not in color_names:
                     color_names.append(name)
             
@@ -261,43 +475,10 @@ class ImageProcessor:
             return []
     
     def _rgb_to_color_name(self, rgb: tuple) -> str:
-        """Convert RGB tuple to closest color name"""
-        try:
-            # Try exact match first
-            return webcolors.rgb_to_name(rgb)
-        except ValueError:
-            # Find closest color
-            min_distance = float('inf')
-            closest_name = 'gray'
-            
-            # Simplified color palette
-            colors = {
-                'white': (255, 255, 255),
-                'black': (0, 0, 0),
-                'gray': (128, 128, 128),
-                'red': (255, 0, 0),
-                'blue': (0, 0, 255),
-                'navy': (0, 0, 128),
-                'green': (0, 128, 0),
-                'yellow': (255, 255, 0),
-                'orange': (255, 165, 0),
-                'pink': (255, 192, 203),
-                'purple': (128, 0, 128),
-                'brown': (139, 69, 19),
-                'beige': (245, 245, 220),
-                'cream': (255, 253, 208),
-                'tan': (210, 180, 140),
-            }
-            
-            for name, color in colors.items():
-                distance = sum((a - b) ** 2 for a, b in zip(rgb, color))
-                if distance < min_distance:
-                    min_distance = distance
-                    closest_name = name
-            
-            return closest_name
+        """Convert RGB tuple to closest palette color name"""
+        return _PALETTE_NAMES[_NAME_LUT[_lut_index(rgb)]]
     
-    def detect_attributes(self, image: Image.Image, category: str, colors: list) -> dict:
+    def detect_attributes(self, image: ImageLike, category: str, colors: list) -> dict:
         """Detect style and season attributes"""
         attributes = {
             'style': 'casual',
@@ -4,8 +4,174 @@ Rule-based outfit combination and recommendation
 """
 
 import random
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict
+from itertools import groupby, islice
+from operator import attrgetter
+from typing import Optional, List, Dict, Sequence
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # optional - large wardrobes fall back to the NumPy scorer
+    njit = None
+
+# Shared read-only stand-in for a missing outfit slot
+_EMPTY: Dict = {}
+
+
+# Today's outfit response as (ts, response), keyed by 'daily_outfit:YYYYMMDD' so it expires at
+# UTC midnight. The cache is per process, so entries also expire after DAILY_OUTFIT_CACHE_TTL
+# seconds for feedback handled by other workers to show up.
+DAILY_OUTFIT_CACHE_TTL = 30
+_DAILY_OUTFIT_CACHE: Dict[str, tuple] = {}
+
+
+def invalidate_daily_outfit() -> None:
+    """Drop the cached daily outfit (call after mutating outfits or wardrobe items)"""
+    _DAILY_OUTFIT_CACHE.clear()
+
+
+def _store_daily_outfit(cache_key: str, result: Dict) -> None:
+    """Cache today's outfit response (only today's key is ever kept)"""
+    _DAILY_OUTFIT_CACHE.clear()
+    _DAILY_OUTFIT_CACHE[cache_key] = (time.monotonic(), result)
+
+
+# (date, midnight datetime, cache key) for the current UTC day, rebuilt when the date rolls over
+_MIDNIGHT_CACHE: Dict[str, tuple] = {}
+
+
+def _today_midnight() -> tuple:
+    """Today's UTC midnight and daily outfit cache key, built once per day"""
+    today = datetime.utcnow().date()
+    cached = _MIDNIGHT_CACHE.get('today')
+    if cached is None or cached[0] != today:
+        cached = (today, datetime.combine(today, datetime.min.time()), f'daily_outfit:{today:%Y%m%d}')
+        _MIDNIGHT_CACHE['today'] = cached
+    return cached[1], cached[2]
+
+
+# Candidate pools from _get_items_by_category, reused across shuffles for up to
+# ITEMS_CACHE_TTL seconds; ClothingItem mapper events clear it on any change.
+ITEMS_CACHE_TTL = 60
+_ITEMS_CACHE: Dict[str, tuple] = {}
+
+
+def invalidate_items_cache() -> None:
+    """Drop the cached candidate pools (call after mutating wardrobe items)"""
+    _ITEMS_CACHE.clear()
+
+
+# Colors and styles are scored as small integer ids. The known vocabulary gets fixed ids
+# (and bits in the lookup masks); anything else is assigned a new id on first sight and
+# shares the trailing "other" bit, which no mask sets, so it can only ever match itself.
+COLOR_VOCAB = (
+    'white', 'black', 'gray', 'beige', 'cream', 'tan', 'navy',
+    'blue', 'red', 'green', 'yellow', 'purple', 'orange', 'pink', 'brown',
+)
+STYLE_VOCAB = ('casual', 'formal', 'sporty', 'streetwear')
+
+_COLOR_IDS = {name: i for i, name in enumerate(COLOR_VOCAB)}
+_STYLE_IDS = {name: i for i, name in enumerate(STYLE_VOCAB)}
+_IDS_LOCK = threading.Lock()
+
+# Wardrobes larger than this are scored by the Numba kernel when numba is installed
+JIT_MIN_ITEMS = 500
+
+
+# Ids for a missing value and for a name never stored in the wardrobe
+MISSING_ID = -1
+UNSEEN_ID = -2
+
+
+def _encode(value: Optional[str], ids: Dict[str, int]) -> int:
+    """Integer id for a stored color/style name, registering new names; MISSING_ID for a missing value"""
+    if not value:
+        return MISSING_ID
+    code = ids.get(value)
+    if code is None:
+        with _IDS_LOCK:
+            code = ids.setdefault(value, len(ids))
+    return code
+
+
+def _lookup(value: Optional[str], ids: Dict[str, int]) -> int:
+    """Like _encode, but never registers: untrusted names (request input) map to UNSEEN_ID"""
+    if not value:
+        return MISSING_ID
+    return ids.get(value, UNSEEN_ID)
+
+
+def _bitmask(names, ids: Dict[str, int]) -> int:
+    """Bitfield with bit ids[name] set for each name"""
+    return sum(1 << ids[name] for name in names)
+
+
+def _pair_masks(pairs: Dict[str, frozenset], ids: Dict[str, int], size: int) -> np.ndarray:
+    """Per-id bitfields (size + 1 entries, the last for "other") of each id's listed matches"""
+    masks = np.zeros(size + 1, dtype=np.uint32)
+    for ref, matches in pairs.items():
+        masks[ids[ref]] = _bitmask(matches, ids)
+    return masks
+
+
+def _score_items(item_colors, item_styles, item_wear, ref_color, ref_style, style_pref,
+                 neutral_mask, comp_masks, style_masks):
+    """Per-item match scores as a plain loop over int-encoded arrays (compiled by Numba)"""
+    n_colors = comp_masks.shape[0] - 1
+    n_styles = style_masks.shape[0] - 1
+    # Unseen reference names share the "other" slot, like unknown item names
+    ref_c = min(ref_color, n_colors) if ref_color >= 0 else n_colors
+    ref_s = min(ref_style, n_styles) if ref_style >= 0 else n_styles
+    
+    scores = np.zeros(item_colors.shape[0], dtype=np.int32)
+    for i in range(item_colors.shape[0]):
+        score = 0
+        
+        color = item_colors[i]
+        if color >= 0 and ref_color != MISSING_ID:
+            c = min(color, n_colors)
+            if (neutral_mask >> c) & 1:
+                score += 3
+            elif (neutral_mask >> ref_c) & 1:
+                score += 2
+            elif (comp_masks[ref_c] >> c) & 1:
+                score += 4
+            elif color == ref_color:
+                score += 1
+        
+        style = item_styles[i]
+        if style == ref_style or (style_masks[ref_s] >> min(style, n_styles)) & 1:
+            score += 2
+        if style_pref >= 0 and style == style_pref:
+            score += 1
+        
+        wear = item_wear[i]
+        score += (wear < 3) + 2 * (wear == 0)
+        scores[i] = score
+    return scores
+
+
+_score_items_jit = njit(cache=True)(_score_items) if njit is not None else None
+
+
+class CandidatePool:
+    """
+    One category's wardrobe items plus per-item column arrays for vectorized scoring.
+    Colors are stored lowercased (ClothingItem validates primary_color), so no per-item normalizing.
+    """
+    
+    def __init__(self, items: List):
+        self.items = items
+        self.color_ids = np.array([_encode(item.primary_color, _COLOR_IDS) for item in items], dtype=np.int32)
+        self.style_ids = np.array([_encode(item.style or 'casual', _STYLE_IDS) for item in items], dtype=np.int32)
+        self.wear_counts = np.array([item.wear_count or 0 for item in items], dtype=np.int32)
+    
+    def __len__(self) -> int:
+        return len(self.items)
 
 
 class OutfitEngine:
@@ -15,25 +181,31 @@ class OutfitEngine:
     NEUTRAL_COLORS = {'white', 'black', 'gray', 'beige', 'cream', 'tan', 'navy'}
     
     COMPLEMENTARY_PAIRS = {
-        'blue': ['orange', 'tan', 'cream'],
-        'red': ['green', 'gray'],
-        'green': ['red', 'pink'],
-        'yellow': ['purple', 'navy'],
-        'purple': ['yellow', 'cream'],
-        'orange': ['blue', 'navy'],
-        'pink': ['green', 'gray'],
-        'navy': ['white', 'cream', 'tan', 'orange'],
-        'brown': ['blue', 'cream', 'white'],
+        'blue': frozenset({'orange', 'tan', 'cream'}),
+        'red': frozenset({'green', 'gray'}),
+        'green': frozenset({'red', 'pink'}),
+        'yellow': frozenset({'purple', 'navy'}),
+        'purple': frozenset({'yellow', 'cream'}),
+        'orange': frozenset({'blue', 'navy'}),
+        'pink': frozenset({'green', 'gray'}),
+        'navy': frozenset({'white', 'cream', 'tan', 'orange'}),
+        'brown': frozenset({'blue', 'cream', 'white'}),
     }
     
     # Style compatibility matrix
     STYLE_COMPATIBILITY = {
-        'casual': ['casual', 'sporty', 'streetwear'],
-        'formal': ['formal'],
-        'sporty': ['sporty', 'casual'],
-        'streetwear': ['streetwear', 'casual', 'sporty'],
+        'casual': frozenset({'casual', 'sporty', 'streetwear'}),
+        'formal': frozenset({'formal'}),
+        'sporty': frozenset({'sporty', 'casual'}),
+        'streetwear': frozenset({'streetwear', 'casual', 'sporty'}),
     }
     
+    # Bitmasks over COLOR_VOCAB / STYLE_VOCAB ids for the scorers: bit c of NEUTRAL_MASK
+    # marks a neutral color, bit c of COMP_MASK[r] a complement of color r
+    NEUTRAL_MASK = _bitmask(NEUTRAL_COLORS, _COLOR_IDS)
+    COMP_MASK = _pair_masks(COMPLEMENTARY_PAIRS, _COLOR_IDS, len(COLOR_VOCAB))
+    STYLE_COMPAT_MASK = _pair_masks(STYLE_COMPATIBILITY, _STYLE_IDS, len(STYLE_VOCAB))
+    
     # Outfit descriptions based on style
     STYLE_DESCRIPTIONS = {
         'casual': [
@@ -65,6 +237,10 @@ class OutfitEngine:
         'streetwear': 'Street Style',
     }
     
+    # Fallbacks for styles without their own entry
+    _DEFAULT_DESCRIPTIONS = STYLE_DESCRIPTIONS['casual']
+    _DEFAULT_TAG = STYLE_TAGS['casual']
+    
     def __init__(self):
         # Import here to avoid circular imports
         from app import db, ClothingItem, Outfit
@@ -74,17 +250,25 @@ class OutfitEngine:
     
     def generate_daily_outfit(self) -> Optional[Dict]:
         """Generate today's outfit recommendation"""
+        midnight, cache_key = _today_midnight()
+        cached = _DAILY_OUTFIT_CACHE.get(cache_key)
+        if cached is not None and time.monotonic() - cached[0] < DAILY_OUTFIT_CACHE_TTL:
+            return cached[1]
+        
         # Check if we already have an outfit for today
-        today = datetime.utcnow().date()
         existing = self.Outfit.query.filter(
-            self.Outfit.created_at >= datetime.combine(today, datetime.min.time())
+            self.Outfit.created_at >= midnight
         ).first()
         
         if existing:
-            return self._outfit_to_response(existing)
+            result = self._outfit_to_response(existing)
+        else:
+            # Generate new outfit (committed before it returns)
+            result = self.generate_outfit()
         
-        # Generate new outfit
-        return self.generate_outfit()
+        if result:
+            _store_daily_outfit(cache_key, result)
+        return result
     
     def generate_outfit(self, style_preference: Optional[str] = None) -> Optional[Dict]:
         """
@@ -96,8 +280,81 @@ class OutfitEngine:
         Returns:
             Outfit dictionary with items and metadata
         """
-        # Get all wardrobe items grouped by category
-        items_by_category = self._get_items_by_category()
+        picked = self._pick_and_load([None], style_preference)
+        if not picked:
+            return None
+        
+        outfit_items = picked[0]
+        outfit = self._new_outfit(outfit_items)
+        
+        self.db.session.add(outfit)
+        self.db.session.commit()
+        
+        return self._outfit_to_response(outfit, outfit_items)
+    
+    def generate_outfits(self, count: int, style_preference: Optional[str] = None) -> List[Dict]:
+        """
+        Generate several outfits, saved with one bulk insert and a single commit.
+        
+        Args:
+            count: Number of outfits to generate
+            style_preference: Optional style to prefer (casual, formal, sporty)
+        
+        Returns:
+            List of outfit dictionaries (empty if the wardrobe is too small)
+        """
+        # Draw every outfit's layer/accessory coin flips in one go
+        coin_flips = np.random.random((count, 2)).tolist()
+        batch_items = self._pick_and_load(coin_flips, style_preference)
+        if not batch_items:
+            return []
+        
+        outfits = [self._new_outfit(outfit_items) for outfit_items in batch_items]
+        
+        # Bulk saves don't read column defaults back, so set them on the batch explicitly
+        now = datetime.utcnow()
+        for outfit in outfits:
+            outfit.created_at = now
+            outfit.is_liked = False
+            outfit.is_saved = False
+        
+        # Single INSERT batch (ids fetched back for the response) and a single commit
+        self.db.session.bulk_save_objects(outfits, return_defaults=True)
+        self.db.session.commit()
+        
+        return [self._outfit_to_response(outfit, outfit_items) for outfit, outfit_items in zip(outfits, batch_items)]
+    
+    def _pick_and_load(self, coin_flips: List[Optional[Sequence[float]]], style_preference: Optional[str] = None) -> List[Dict]:
+        """
+        Pick one outfit per coin_flips entry and load full dicts for the chosen items.
+        Cached pools can still offer items deleted since (by another worker or directly
+        in the database); if any chosen item is gone, reload the pools and pick again once.
+        """
+        for _ in range(2):
+            items_by_category = self._get_items_by_category()
+            picks = [self._pick_outfit_items(items_by_category, style_preference, flips) for flips in coin_flips]
+            picks = [chosen for chosen in picks if chosen]
+            
+            # Materialize full item dicts only for the chosen items, in one query for the batch
+            item_dicts = self._load_item_dicts(list({item.id for chosen in picks for item in chosen.values()}))
+            if all(item.id in item_dicts for chosen in picks for item in chosen.values()):
+                return [{slot: item_dicts[item.id] for slot, item in chosen.items()} for chosen in picks]
+            invalidate_items_cache()
+        return []
+    
+    def _pick_outfit_items(
+        self,
+        items_by_category: Dict[str, CandidatePool],
+        style_preference: Optional[str] = None,
+        coin_flips: Optional[Sequence[float]] = None
+    ):
+        """
+        Pick one outfit's items (slot -> candidate row), or None if the wardrobe can't make one.
+        coin_flips are pre-drawn [0, 1) values for the layer and accessory decisions.
+        """
+        if coin_flips is None:
+            coin_flips = (random.random(), random.random())
+        layer_flip, accessory_flip = coin_flips
         
         # Check minimum requirements
         if not items_by_category.get('tops') or not items_by_category.get('bottoms'):
@@ -133,7 +390,7 @@ class OutfitEngine:
             outfit_items['shoes'] = shoes
         
         # Optional: Select layer
-        if items_by_category.get('layers') and random.random() > 0.5:
+        if items_by_category.get('layers') and layer_flip > 0.5:
             layer = self._select_matching_item(
                 items_by_category['layers'],
                 top,
@@ -142,70 +399,85 @@ class OutfitEngine:
             outfit_items['layer'] = layer
         
         # Optional: Select accessory
-        if items_by_category.get('accessories') and random.random() > 0.7:
-            accessory = random.choice(items_by_category['accessories'])
+        if items_by_category.get('accessories') and accessory_flip > 0.7:
+            accessory = random.choice(items_by_category['accessories'].items)
             outfit_items['accessory'] = accessory
         
+        return {slot: item for slot, item in outfit_items.items() if item}
+    
+    def _new_outfit(self, outfit_items: Dict):
+        """Build an unsaved Outfit row from materialized item dicts"""
         # Determine overall style
         overall_style = self._determine_outfit_style(outfit_items)
         
         # Create outfit record
-        outfit = self.Outfit(
+        return self.Outfit(
             name=f"Outfit {datetime.now().strftime('%m/%d')}",
-            style_tag=self.STYLE_TAGS.get(overall_style, 'Clean Casual'),
-            description=random.choice(self.STYLE_DESCRIPTIONS.get(overall_style, self.STYLE_DESCRIPTIONS['casual'])),
-            top_id=outfit_items.get('top', {}).get('id'),
-            bottom_id=outfit_items.get('bottom', {}).get('id'),
-            layer_id=outfit_items.get('layer', {}).get('id'),
-            shoes_id=outfit_items.get('shoes', {}).get('id'),
-            accessory_id=outfit_items.get('accessory', {}).get('id')
+            style_tag=self.STYLE_TAGS.get(overall_style, self._DEFAULT_TAG),
+            description=random.choice(self.STYLE_DESCRIPTIONS.get(overall_style, self._DEFAULT_DESCRIPTIONS)),
+            top_id=(outfit_items.get('top') or _EMPTY).get('id'),
+            bottom_id=(outfit_items.get('bottom') or _EMPTY).get('id'),
+            layer_id=(outfit_items.get('layer') or _EMPTY).get('id'),
+            shoes_id=(outfit_items.get('shoes') or _EMPTY).get('id'),
+            accessory_id=(outfit_items.get('accessory') or _EMPTY).get('id')
         )
+    
+    def _get_items_by_category(self) -> Dict[str, CandidatePool]:
+        """
+        Get all wardrobe items grouped by category, least worn first.
+        Items are lightweight (id, category, style, primary_color, wear_count) rows rather than
+        ORM instances; load full dicts for the chosen ones with _load_item_dicts.
+        """
+        cached = _ITEMS_CACHE.get('pools')
+        if cached is not None and time.monotonic() - cached[0] < ITEMS_CACHE_TTL:
+            return cached[1]
         
-        self.db.session.add(outfit)
-        self.db.session.commit()
+        ClothingItem = self.ClothingItem
+        items = ClothingItem.query.with_entities(
+            ClothingItem.id,
+            ClothingItem.category,
+            ClothingItem.style,
+            ClothingItem.primary_color,
+            ClothingItem.wear_count,
+        ).order_by(ClothingItem.category, ClothingItem.wear_count.asc()).all()
         
-        return self._outfit_to_response(outfit, outfit_items)
+        pools = {
+            category: CandidatePool(list(group))
+            for category, group in groupby(items, key=attrgetter('category'))
+        }
+        _ITEMS_CACHE['pools'] = (time.monotonic(), pools)
+        return pools
     
-    def _get_items_by_category(self) -> Dict[str, List]:
-        """Get all wardrobe items grouped by category"""
-        items = self.ClothingItem.query.all()
-        by_category = {}
-        
-        for item in items:
-            category = item.category
-            if category not in by_category:
-                by_category[category] = []
-            by_category[category].append(item.to_dict())
-        
-        return by_category
+    def _load_item_dicts(self, ids: List[int]) -> Dict[int, Dict]:
+        """Load full item dicts for the given ids in a single query"""
+        if not ids:
+            return {}
+        rows = self.ClothingItem.query.filter(self.ClothingItem.id.in_(ids)).all()
+        return {row.id: row.to_dict() for row in rows}
     
-    def _select_item(self, items: List[Dict], style_pref: Optional[str] = None) -> Optional[Dict]:
+    def _select_item(self, pool: CandidatePool, style_pref: Optional[str] = None):
         """Select an item, preferring less recently worn"""
-        if not items:
+        if not pool:
             return None
+        items = pool.items
         
-        # Filter by style if preference given
+        # Pools are ordered least worn first, so the first three items (matching the style
+        # preference, if any match) are the three least worn - stop scanning once found
+        matching = None
         if style_pref:
-            matching = [i for i in items if i.get('style') == style_pref]
-            if matching:
-                items = matching
+            matching = list(islice((i for i in items if i.style == style_pref), 3))
         
-        # Sort by wear count (prefer less worn)
-        items_sorted = sorted(items, key=lambda x: x.get('wearCount', 0))
-        
-        # Pick from top 3 least worn
-        candidates = items_sorted[:min(3, len(items_sorted))]
-        return random.choice(candidates)
+        return random.choice(matching or items[:3])
     
     def _select_matching_item(
         self,
-        items: List[Dict],
-        reference_item: Dict,
+        pool: CandidatePool,
+        reference_item,
         style_pref: Optional[str] = None,
-        secondary_ref: Optional[Dict] = None
-    ) -> Optional[Dict]:
+        secondary_ref=None
+    ):
         """Select an item that matches the reference item"""
-        if not items:
+        if not pool:
             return None
         
         # Safe getters
@@ -213,98 +485,90 @@ class OutfitEngine:
         ref_style = 'casual'
         
         if reference_item:
-            ref_color = (reference_item.get('primaryColor') or '').lower()
-            ref_style = (reference_item.get('style') or 'casual')
+            ref_color = reference_item.primary_color or ''
+            ref_style = (reference_item.style or 'casual')
         
-        scored_items = []
+        ref_color_id = _lookup(ref_color, _COLOR_IDS)
+        ref_style_id = _lookup(ref_style, _STYLE_IDS)
+        style_pref_id = _lookup(style_pref, _STYLE_IDS)
         
-        for item in items:
-            score = 0
-            # Safe getters for item attributes
-            item_color = (item.get('primaryColor') or '').lower()
-            item_style = (item.get('style') or 'casual')
-            
-            # Color harmony scoring
-            if item_color and ref_color:
-                if item_color in self.NEUTRAL_COLORS:
-                    score += 3  # Neutrals always work
-                elif ref_color in self.NEUTRAL_COLORS:
-                    score += 2  # Pairs well with neutral
-                elif item_color in self.COMPLEMENTARY_PAIRS.get(ref_color, []):
-                    score += 4  # Complementary colors
-                elif item_color == ref_color:
-                    score += 1  # Same color (monochrome)
-            
-            # Style compatibility
-            if item_style in self.STYLE_COMPATIBILITY.get(ref_style, [ref_style]):
-                score += 2
-            
-            # Style preference bonus
-            if style_pref and item_style == style_pref:
-                score += 1
-            
-            # Avoid recently worn
-            if item.get('wearCount', 0) < 3:
-                score += 1
-            
-            # Prioritize new items! (wearCount 0)
-            if item.get('wearCount', 0) == 0:
-                score += 2
-            
-            scored_items.append((item, score))
+        if _score_items_jit is not None and len(pool) > JIT_MIN_ITEMS:
+            scores = _score_items_jit(
+                pool.color_ids, pool.style_ids, pool.wear_counts,
+                ref_color_id, ref_style_id, style_pref_id,
+                self.NEUTRAL_MASK, self.COMP_MASK, self.STYLE_COMPAT_MASK,
+            )
+        else:
+            scores = self._score_items_vectorized(pool, ref_color_id, ref_style_id, style_pref_id)
         
-        # Sort by score descending
-        scored_items.sort(key=lambda x: -x[1])
+        # Pick from the top 5 candidates (without sorting the rest), weighted by score
+        k = min(5, len(scores))
+        top_indices = np.argpartition(-scores, k - 1)[:k]
+        weights = (scores[top_indices] + 1).tolist()
+        return pool.items[random.choices(top_indices.tolist(), weights=weights, k=1)[0]]
+    
+    def _score_items_vectorized(self, pool: CandidatePool, ref_color: int, ref_style: int, style_pref: int) -> np.ndarray:
+        """NumPy equivalent of _score_items, used for smaller wardrobes or when numba is missing"""
+        colors = pool.color_ids
+        styles = pool.style_ids
+        wear_counts = pool.wear_counts
+        
+        # Ids outside the known vocabulary (and unseen reference names) share the trailing
+        # "other" bit; missing item colors are clipped to a valid shift and masked out by has_colors
+        n_colors = len(COLOR_VOCAB)
+        n_styles = len(STYLE_VOCAB)
+        item_c = np.clip(colors, 0, n_colors)
+        ref_c = min(ref_color, n_colors) if ref_color >= 0 else n_colors
+        ref_s = min(ref_style, n_styles) if ref_style >= 0 else n_styles
+        
+        # Color harmony scoring (first matching rule wins, like an if/elif chain)
+        has_colors = (colors >= 0) & (ref_color != MISSING_ID)
+        color_score = np.select(
+            [
+                has_colors & ((self.NEUTRAL_MASK >> item_c) & 1 == 1),  # Neutrals always work
+                has_colors & ((self.NEUTRAL_MASK >> ref_c) & 1 == 1),  # Pairs well with neutral
+                has_colors & ((self.COMP_MASK[ref_c] >> item_c) & 1 == 1),  # Complementary colors
+                has_colors & (colors == ref_color),  # Same color (monochrome)
+            ],
+            [3, 2, 4, 1],
+            default=0,
+        )
+        
+        # Style compatibility
+        compatible = (styles == ref_style) | ((self.STYLE_COMPAT_MASK[ref_s] >> np.minimum(styles, n_styles)) & 1 == 1)
+        scores = color_score + 2 * compatible
         
-        # Pick from top candidates
-        top_candidates = scored_items[:min(3, len(scored_items))]
-        if top_candidates:
-            # Weighted random choice? No, just random from top 3
-            return random.choice(top_candidates)[0]
+        # Style preference bonus
+        if style_pref >= 0:
+            scores += styles == style_pref
         
-        return random.choice(items)
+        # Avoid recently worn (+1), and prioritize new items! (wearCount 0, +2 more)
+        scores += (wear_counts < 3) + 2 * (wear_counts == 0)
+        return scores
     
     def _determine_outfit_style(self, outfit_items: Dict) -> str:
         """Determine the overall outfit style based on items"""
-        styles = []
+        counts = {}
         
         for item in outfit_items.values():
-            if item and item.get('style'):
-                styles.append(item['style'])
-        
-        if not styles:
-            return 'casual'
+            style = item and item.get('style')
+            if style:
+                counts[style] = counts.get(style, 0) + 1
         
-        # Most common style wins
-        from collections import Counter
-        most_common = Counter(styles).most_common(1)
-        return most_common[0][0] if most_common else 'casual'
+        # Most common style wins (ties go to the first style seen)
+        return max(counts, key=counts.get, default='casual')
     
     def _outfit_to_response(self, outfit, items: Optional[Dict] = None) -> Dict:
         """Convert outfit to API response format"""
         if items is None:
-            # Load items from database
-            items = {}
-            if outfit.top_id:
-                top = self.ClothingItem.query.get(outfit.top_id)
-                if top:
-                    items['top'] = top.to_dict()
-            if outfit.bottom_id:
-                bottom = self.ClothingItem.query.get(outfit.bottom_id)
-                if bottom:
-                    items['bottom'] = bottom.to_dict()
-            if outfit.layer_id:
-                layer = self.ClothingItem.query.get(outfit.layer_id)
-                if layer:
-                    items['layer'] = layer.to_dict()
-            if outfit.shoes_id:
-                shoes = self.ClothingItem.query.get(outfit.shoes_id)
-                if shoes:
-                    items['shoes'] = shoes.to_dict()
-            if outfit.accessory_id:
-                accessory = self.ClothingItem.query.get(outfit.accessory_id)
-                if accessory:
-                    items['accessory'] = accessory.to_dict()
+            # Load all of the outfit's items from the database in one query
+            slot_ids = {slot: getattr(outfit, f'{slot}_id') for slot in self.Outfit.ITEM_SLOTS}
+            item_dicts = self._load_item_dicts([iid for iid in slot_ids.values() if iid])
+            items = {
+                slot: item_dicts[iid]
+                for slot, iid in slot_ids.items()
+                if iid in item_dicts
+            }
         
         return {
             'id': outfit.id,